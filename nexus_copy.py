@@ -7,17 +7,38 @@ https://help.sonatype.com/en/uploading-components.html
 """
 
 import argparse
+import hashlib
 import os
 import json
+import logging
+import logging.handlers
+import mimetypes
 import re
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
 import pprint
 import subprocess
 import getpass
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
 source_server = os.environ.get('SOURCE_NEXUS_SERVER')
 source_user = os.environ.get('SOURCE_NEXUS_USER')
 source_password = os.environ.get('SOURCE_NEXUS_PASSWORD')
@@ -29,19 +50,63 @@ destination_password = os.environ.get('DESTINATION_NEXUS_PASSWORD')
 api_path = 'service/rest/v1'
 local_path = './'
 asset_type_filters = {
-    'apt': r'.(deb|udeb)$',
-    'npm': r'.tgz$',
-    'maven2': r'.(jar|zip|xml|pom|war|ear)$',
-    'yum': r'.(rpm|drpm)$',
-    'pypi': r'.tar.gz$',
-    'rubygems': r'.gem$',
-    'nuget': r'.nupkg$',
+    'apt': re.compile(r'\.(deb|udeb)$', re.IGNORECASE),
+    'npm': re.compile(r'\.tgz$', re.IGNORECASE),
+    'maven2': re.compile(r'\.(jar|zip|xml|pom|war|ear)$', re.IGNORECASE),
+    'yum': re.compile(r'\.(rpm|drpm)$', re.IGNORECASE),
+    'pypi': re.compile(r'\.tar\.gz$', re.IGNORECASE),
+    'rubygems': re.compile(r'\.gem$', re.IGNORECASE),
+    'nuget': re.compile(r'\.nupkg$', re.IGNORECASE),
+}
+# Asset fields kept per format. Formats listed here are only kept when the asset has their format specific section.
+asset_format_fields = {
+    'maven2': ('format', 'downloadUrl', 'path', 'id', 'maven2', 'contentType'),
+    'npm': ('format', 'downloadUrl', 'path', 'id', 'npm', 'contentType'),
 }
+default_asset_fields = ('format', 'downloadUrl', 'path', 'id')
+mime_types_by_extension = {
+    '.deb': 'application/vnd.debian.binary-package',
+    '.udeb': 'application/vnd.debian.binary-package',
+    '.rpm': 'application/x-rpm',
+    '.drpm': 'application/x-rpm',
+    '.jar': 'application/java-archive',
+    '.war': 'application/java-archive',
+    '.ear': 'application/java-archive',
+    '.pom': 'text/xml',
+    '.xml': 'text/xml',
+    '.zip': 'application/zip',
+    '.tgz': 'application/gzip',
+    '.gz': 'application/gzip',
+    '.gem': 'application/x-tar',
+    '.nupkg': 'application/zip',
+}
+sessions = {}
+sessions_lock = threading.Lock()
+max_workers = 8
+http_cache_expire = None
+docker_daemon_config = '/etc/docker/daemon.json'
+docker_root_dirs_checked = set()
+local_docker_images = None
+existing_asset_hashes = {}
+
+
+logger = logging.getLogger('nexus_copy')
 
 
-def log_print(*msg):
-    now = datetime.now()
-    print(f"{now} : ", ' '.join(msg))
+def setup_logging():
+    """Log to stdout, batching the writes when stdout is not a terminal."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s : %(message)s'))
+    if not sys.stdout.isatty():
+        handler = logging.handlers.MemoryHandler(100, flushLevel=logging.WARNING, target=handler)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def flush_log():
+    """Write out buffered log records before a subprocess writes to the same stdout."""
+    for handler in logger.handlers:
+        handler.flush()
 
 
 def set_nexus_source_server(server=None):
@@ -56,15 +121,67 @@ def set_nexus_destination_server(server=None):
         destination_server = server
 
 
+def set_max_workers(workers=None):
+    global max_workers
+    if workers is not None:
+        if not isinstance(workers, int) or workers < 1:
+            logger.error("Invalid number of workers '%s', it must be an integer of at least 1.", workers)
+            raise SystemExit(f"Invalid number of workers '{workers}', it must be an integer of at least 1.")
+        max_workers = workers
+
+
+def get_session(direction='source'):
+    """Return the pooled keep-alive session for <direction>, created on first use.
+
+    When <http_cache_expire> is set, source API responses are cached in a local sqlite file and
+    revalidated with conditional requests once expired. Downloads and the destination are never cached.
+    """
+    with sessions_lock:
+        if direction not in sessions:
+            if direction == 'source' and http_cache_expire is not None:
+                if requests_cache is None:
+                    logger.error("HTTP cache requested but requests-cache is not installed.")
+                    raise SystemExit("HTTP cache requested but requests-cache is not installed.")
+                session = requests_cache.CachedSession(
+                    cache_name='.nexus_cache',
+                    backend='sqlite',
+                    allowable_methods=('GET',),
+                    expire_after=requests_cache.DO_NOT_CACHE,
+                    urls_expire_after={f"*/{api_path}/*": http_cache_expire},
+                )
+            else:
+                session = requests.Session()
+            retries = Retry(total=5, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+            # One pooled connection per worker thread, so parallel transfers never open throwaway connections.
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_workers, max_retries=retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Connection': 'keep-alive'})
+            sessions[direction] = session
+    return sessions[direction]
+
+
+def run_in_pool(func, tasks):
+    """Run func(*task) for every task on a pool of <max_workers> threads, re-raising the first failure."""
+    if not tasks:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, *task) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
 def get_file_mime_type(file):
-    p = subprocess.Popen(["file", "--brief", "--mime-type", file], stdout=subprocess.PIPE)
-    (output, _) = p.communicate()
-    p.wait()
-    mime_type = output.decode().rstrip()
-    return mime_type
+    """Guess the mime type of <file> from its extension, without running `file` on it."""
+    extension = os.path.splitext(file)[1].lower()
+    return mime_types_by_extension.get(extension) or mimetypes.guess_type(file)[0] or 'application/octet-stream'
 
 
-def api_call(url, type='GET', files={}, data={}, direction='source'):
+def api_call(url, type='GET', files={}, data={}, direction='source', headers=None):
     """Generic Nexus Rest API call."""
     start = datetime.now()
     auth = {}
@@ -78,42 +195,40 @@ def api_call(url, type='GET', files={}, data={}, direction='source'):
         username = destination_user
         password = destination_password
 
-    log_print(f"api_call : type={type} direction={direction} url={url}")
+    logger.info("api_call : type=%s direction=%s url=%s", type, direction, url)
 
     try:
         if password is not None:
             auth = HTTPBasicAuth(username, password)
 
-        if type == 'GET':
-            response = requests.get(url, auth=auth)
-        elif type == 'POST':
-            response = requests.post(url, files=files, data=data, auth=auth)
-        else:
-            log_print(f"Unsupported method '{type}'... ")
+        if type not in ('GET', 'POST'):
+            logger.error("Unsupported method '%s'... ", type)
+            raise SystemExit(f"Unsupported method '{type}'")
+        response = get_session(direction).request(type, url, auth=auth, files=files, data=data, headers=headers)
         response.raise_for_status()
-        if response.text is not None and response.text != '':
-            return_value = json.loads(response.text)
+        if response.content:
+            return_value = json_loads(response.content)
 
         end = datetime.now()
         call_time = end - start
-        # log_print(f"url={url}, files={files}, data={data}, auth={auth}")
-        log_print(f"api_call done. time taken : {call_time}")
+        # logger.info("url=%s, files=%s, data=%s, auth=%s", url, files, data, auth)
+        logger.info("api_call done. time taken : %s", call_time)
         return return_value
     except requests.exceptions.ConnectionError as e:
-        log_print(f"Nexus api {type} call failed. Error Connecting:", e)
+        logger.error("Nexus api %s call failed. Error Connecting: %s", type, e)
         raise SystemExit(e)
     except requests.exceptions.Timeout as e:
-        log_print(f"Nexus api {type} call failed. Timeout Error:", e)
+        logger.error("Nexus api %s call failed. Timeout Error: %s", type, e)
         raise SystemExit(e)
     except requests.exceptions.HTTPError as e:
-        log_print(f"Nexus api {type} call failed. HTTPError : {e}")
-        log_print(f"url={url}, files={files}, data={data}, auth={auth}")
+        logger.error("Nexus api %s call failed. HTTPError : %s", type, e)
+        logger.error("url=%s, files=%s, data=%s, auth=%s", url, files, data, auth)
         raise SystemExit(e)
     except requests.exceptions.RequestException as e:
-        log_print(f"Nexus api {type} call failed. RequestException : {e}")
+        logger.error("Nexus api %s call failed. RequestException : %s", type, e)
         raise SystemExit(e)
     except Exception as e:
-        log_print(f"Nexus api {type} call failed. Exception : {e}")
+        logger.error("Nexus api %s call failed. Exception : %s", type, e)
         raise SystemExit(e)
 
 
@@ -122,9 +237,9 @@ def api_get(request, files={}, data={}, direction='source'):
     return api_call(url, 'GET', files, data, direction)
 
 
-def api_post(request, files={}, data={}):
+def api_post(request, files={}, data={}, headers=None):
     url = f"{api_path}/{request}"
-    return api_call(url, 'POST', files, data, 'destination')
+    return api_call(url, 'POST', files, data, 'destination', headers)
 
 
 def get_continuationtoken(data):
@@ -136,15 +251,21 @@ def get_continuationtoken(data):
 
 
 def yield_items(repo, type, direction='source'):
-    """Download page per page of items of type 'assets' or 'components' from a repo and yield each item, reducing memory footprint."""
-    data = api_get(f"{type}?repository={repo}", None, None, direction)
-    for item in data['items']:
-        yield item
-    while (token_req := get_continuationtoken(data)) and (token_req is not False):
-        more_data = api_get(f"{type}?repository={repo}{token_req}", None, None, direction)
-        for item in more_data['items']:
-            yield item
-        data = more_data
+    """Download page per page of items of type 'assets' or 'components' from a repo and yield each item, reducing memory footprint.
+
+    The next page is fetched in the background while the items of the current page are consumed.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        data = api_get(f"{type}?repository={repo}", None, None, direction)
+        while True:
+            next_page = None
+            if token_req := get_continuationtoken(data):
+                next_page = executor.submit(api_get, f"{type}?repository={repo}{token_req}", None, None, direction)
+            for item in data['items']:
+                yield item
+            if next_page is None:
+                break
+            data = next_page.result()
 
 
 def get_asset(id):
@@ -167,9 +288,11 @@ def get_repo_components(repo, direction='source', count=0):
                     'version': component['version'],
                     'repository': component['repository'],
                 }
-                log_print(f"Added component:{name} - {components_fetched}")
+                if components_fetched % 100 == 0:
+                    logger.info("Added component:%s - %s", name, components_fetched)
         if count > 0 and components_fetched >= count:
             break
+    logger.info("Added %s components", len(components))
     return components
 
 
@@ -178,70 +301,86 @@ def get_repo_assets(repo, direction='source', type='components'):
     assets = {}
     count = 0
     for item in yield_items(repo, type, direction):
-        # log_print(f"item:{item}")
+        # logger.info("item:%s", item)
         if type == 'components':
             item_assets = item['assets']
         elif type == 'assets':
             item_assets = [item]
         for asset in item_assets:
-            # log_print(f"asset:{asset}")
-            filter = asset_type_filters.get(asset['format'], None)
-            if filter is None or re.search(rf"{filter}", asset['path']):
+            # logger.info("asset:%s", asset)
+            asset_format = asset.get('format')
+            filter = asset_type_filters.get(asset_format, None)
+            if filter is None or filter.search(asset['path']):
                 count += 1
-                if 'format' in asset:
-                    if asset['format'] == 'maven2':
-                        if 'maven2' in asset:
-                            assets[asset['path']] = {
-                                'format': asset['format'],
-                                'downloadUrl': asset['downloadUrl'],
-                                'path': asset['path'],
-                                'id': asset['id'],
-                                'maven2': asset['maven2'],
-                                'contentType': asset['contentType']
-                            }
-                            if 'classifier' in asset['maven2']:
-                                assets[asset['path']]['classifier'] = asset['maven2']['classifier']
-                    elif asset['format'] == 'npm':
-                        if 'npm' in asset:
-                            assets[asset['path']] = {
-                                'format': asset['format'],
-                                'downloadUrl': asset['downloadUrl'],
-                                'path': asset['path'],
-                                'id': asset['id'],
-                                'npm': asset['npm'],
-                                'contentType': asset['contentType']
-                            }
-                    else:
-                        assets[asset['path']] = {
-                            'format': asset['format'],
-                            'downloadUrl': asset['downloadUrl'],
-                            'path': asset['path'],
-                            'id': asset['id']
-                        }
-                else:
+                if asset_format is None:
                     other.append(asset['path'])
-                log_print(f"Added asset:{asset['path']} - {count}")
+                elif asset_format not in asset_format_fields or asset_format in asset:
+                    fields = asset_format_fields.get(asset_format, default_asset_fields)
+                    assets[asset['path']] = {field: asset[field] for field in fields}
+                    if asset_format == 'maven2' and 'classifier' in asset['maven2']:
+                        assets[asset['path']]['classifier'] = asset['maven2']['classifier']
+                if count % 100 == 0:
+                    logger.info("Added asset:%s - %s", asset['path'], count)
             # else:
-            #     log_print(f"Ignoring filtered asset:{asset['path']}")
+            #     logger.info("Ignoring filtered asset:%s", asset['path'])
+    logger.info("Added %s assets", count)
     return assets, other
 
 
+def get_existing_asset_hashes(repo, direction='destination'):
+    """Return {path: sha1} of the assets present in <repo>, listed only once per server and repo."""
+    server = source_server if direction == 'source' else destination_server
+    key = (server, repo)
+    if key not in existing_asset_hashes:
+        existing_asset_hashes[key] = {
+            asset['path']: asset.get('checksum', {}).get('sha1') for asset in yield_items(repo, 'assets', direction)
+        }
+    return existing_asset_hashes[key]
+
+
+def add_existing_asset_hash(repo, path, sha1, direction='destination'):
+    """Record a freshly uploaded <path> in the cached listing of <repo>, if it was listed already."""
+    server = source_server if direction == 'source' else destination_server
+    if (server, repo) in existing_asset_hashes:
+        existing_asset_hashes[(server, repo)][path] = sha1
+
+
 def list_repo_assets(repo):
     count = 0
     for asset in yield_items(repo, 'assets'):
-        log_print("asset:")
-        pprint.pprint(asset)
+        logger.info("asset:\n%s", pprint.pformat(asset))
         count += len(asset)
-    log_print(f"asset_count:{count}")
+    logger.info("asset_count:%s", count)
 
 
 def list_repo_components(repo):
     count = 0
     for component in yield_items(repo, 'components'):
-        log_print("component:")
-        pprint.pprint(component)
+        logger.info("component:\n%s", pprint.pformat(component))
         count += len(component['assets'])
-    log_print(f"asset_count:{count}")
+    logger.info("asset_count:%s", count)
+
+
+def download_file(url, local_file, chunk_size=1024 * 1024):
+    """Stream <url> to <local_file> in chunks, via a '.part' file renamed into place on success."""
+    part_file = f"{local_file}.part"
+    try:
+        with get_session('source').get(url, allow_redirects=True, stream=True) as response:
+            response.raise_for_status()
+            with open(part_file, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+        os.replace(part_file, local_file)
+    except requests.exceptions.RequestException as e:
+        logger.error("Download of '%s' failed : %s", url, e)
+        if os.path.exists(part_file):
+            os.remove(part_file)
+        raise SystemExit(e)
+
+
+def download_asset(url, local_file, progress):
+    logger.info("Downloading asset '%s' to '%s' - %s", url, local_file, progress)
+    download_file(url, local_file)
 
 
 def download_repo_assets(repo, path='.', force_download=False):
@@ -250,39 +389,71 @@ def download_repo_assets(repo, path='.', force_download=False):
         path = f"{path}/"
     count = 0
     items = len(assets)
+    downloads = []
+    local_dirs = set()
     for _, asset in assets.items():
         count += 1
         local_file = f"{path}{asset['path']}"
-        if not os.path.exists(local_file) or force_download:
-            if not os.path.exists(os.path.dirname(local_file)):
-                log_print(f"Creating directory : {path}{os.path.dirname(asset['path'])}")
-                os.makedirs(os.path.dirname(local_file), exist_ok=True)
-            log_print(f"Downloading asset '{asset['downloadUrl']}' to '{local_file}' - {count}/{items}")
-            response = requests.get(asset['downloadUrl'], allow_redirects=True)
-            open(local_file, 'wb').write(response.content)
+        if force_download or not os.path.exists(local_file):
+            local_dirs.add(os.path.dirname(local_file))
+            downloads.append((asset['downloadUrl'], local_file, f"{count}/{items}"))
         else:
-            log_print(f"Skipping download of '{local_file}' as it already exists. - {count}/{items}")
+            logger.info("Skipping download of '%s' as it already exists. - %s/%s", local_file, count, items)
+    for local_dir in sorted(local_dirs):
+        try:
+            os.makedirs(local_dir)
+            logger.info("Creating directory : %s", local_dir)
+        except FileExistsError:
+            pass
+    run_in_pool(download_asset, downloads)
 
 
 def upload_component(repo, local_file, repo_file, asset_type, mime_type):
-    """Upload single component <file> to <repo>"""
-    data = None
+    """Upload single component <file> to <repo>, streaming the file in the multipart body."""
+    data = {}
     if repo_file is None:
         repo_file = local_file
     repo_path = os.path.dirname(repo_file)
     repo_filename = os.path.basename(repo_file)
     if asset_type == 'raw':
         data = {"raw.directory": f"{repo_path}", "raw.asset1.filename": f"{repo_filename}"}
-        files = [(f"{asset_type}.asset1", (repo_file, open(local_file, 'rb'), mime_type))]
+        field = f"{asset_type}.asset1"
     elif asset_type == 'maven2':
         data = get_maven_info(repo_file)
-        files = [(f"{asset_type}.asset1", (repo_file, open(local_file, 'rb'), mime_type))]
+        field = f"{asset_type}.asset1"
     elif asset_type == 'yum':
         data = {"yum.directory": f"{repo_path}", "yum.asset.filename": f"{repo_filename}"}
-        files = [(f"{asset_type}.asset", (repo_file, open(local_file, 'rb'), mime_type))]
+        field = f"{asset_type}.asset"
     else:  # apt, npm, pypi, raw, docker, gem, nuget
-        files = [(f"{asset_type}.asset", (repo_file, open(local_file, 'rb'), mime_type))]
-    api_post(f"components?repository={repo}", files, data)
+        field = f"{asset_type}.asset"
+    with open(local_file, 'rb') as f:
+        fields = list(data.items()) + [(field, (repo_file, f, mime_type))]
+        encoder = MultipartEncoder(fields=fields)
+        api_post(f"components?repository={repo}", None, encoder, {'Content-Type': encoder.content_type})
+
+
+def get_file_sha1(file):
+    with open(file, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha1').hexdigest()
+        sha1 = hashlib.sha1()
+        while chunk := f.read(1024 * 1024):
+            sha1.update(chunk)
+        return sha1.hexdigest()
+
+
+def upload_file(repo, local_file, repo_file, asset_type, existing_sha1, progress):
+    """Upload <local_file> unless the repo already holds a copy with the same sha1."""
+    sha1 = None
+    if existing_sha1 is not None:
+        sha1 = get_file_sha1(local_file)
+        if sha1 == existing_sha1:
+            logger.info("NOT uploading: local_file:%s, it already exists in repo. - %s", local_file, progress)
+            return
+    mime_type = get_file_mime_type(local_file)
+    logger.info("Uploading: local_file:%s - repo_file:%s - mime_type:%s - %s", local_file, repo_file, mime_type, progress)
+    upload_component(repo, local_file, repo_file, asset_type, mime_type)
+    add_existing_asset_hash(repo, repo_file, sha1)
 
 
 def upload_components(repo, asset_type, path='.', overwrite=False):
@@ -290,32 +461,30 @@ def upload_components(repo, asset_type, path='.', overwrite=False):
     if not path.endswith('/'):
         path = f"{path}/"
     filter = asset_type_filters.get(asset_type, None)
-    assets = []
+    existing_hashes = {}
     if not overwrite:
-        assets, _ = get_repo_assets(repo, 'destination')
+        existing_hashes = get_existing_asset_hashes(repo)
     count = 0
-    file_count = 0
-    for root, _, files in os.walk(path):
-        file_count += len(files)
-    for root, _, files in os.walk(path):
-        for name in files:
-            count += 1
-            # log_print(f"root:{root} - name:{name}")
-            local_file = os.path.join(root, name)
-            if filter is None or re.search(rf"{filter}", name):
-                repo_file = local_file.removeprefix(path)
-                if not repo_file.startswith('/'):
-                    repo_file = f"/{repo_file}"
-                if not overwrite:
-                    # log_print(f"repo_file:{repo_file} - assets:{assets.keys()}")
-                    if repo_file in assets.keys():
-                        log_print(f"NOT uploading: local_file:{local_file}, it already exists in repo. - {count}/{file_count}")
-                        continue
-                mime_type = get_file_mime_type(local_file)
-                log_print(f"Uploading: local_file:{local_file} - repo_file:{repo_file} - mime_type:{mime_type} - {count}/{file_count}")
-                upload_component(repo, local_file, repo_file, asset_type, mime_type)
-            else:
-                log_print(f"Ignoring filtered local_file:{local_file} - {count}/{file_count}")
+    uploads = []
+    local_files = [(root, name) for root, _, files in os.walk(path) for name in files]
+    file_count = len(local_files)
+    for root, name in local_files:
+        count += 1
+        # logger.info("root:%s - name:%s", root, name)
+        local_file = os.path.join(root, name)
+        if filter is None or filter.search(name):
+            repo_file = local_file.removeprefix(path)
+            if not repo_file.startswith('/'):
+                repo_file = f"/{repo_file}"
+            existing_sha1 = existing_hashes.get(repo_file)
+            if repo_file in existing_hashes and existing_sha1 is None:
+                # No checksum to compare against, trust the existing asset.
+                logger.info("NOT uploading: local_file:%s, it already exists in repo. - %s/%s", local_file, count, file_count)
+                continue
+            uploads.append((repo, local_file, repo_file, asset_type, existing_sha1, f"{count}/{file_count}"))
+        else:
+            logger.info("Ignoring filtered local_file:%s - %s/%s", local_file, count, file_count)
+    run_in_pool(upload_file, uploads)
 
 
 def get_maven_info(repo_file):
@@ -327,20 +496,19 @@ def get_maven_info(repo_file):
     version = parts.pop(-1)
     artifact_id = parts.pop(-1)
     groupid = '.'.join(parts)
-    # extension = file_name.replace(f"{artifact_id}-{version}.", '')
-    extension = re.search(rf"{asset_type_filters['maven2']}", file_name).group(0).lstrip('.')
+    base_name, _, extension = file_name.rpartition('.')
+    if base_name.endswith('.tar'):
+        base_name = base_name[:-len('.tar')]
+        extension = f"tar.{extension}"
     info = {
         'maven2.groupId': groupid,
         'maven2.artifactId': artifact_id,
         'maven2.version': version,
         'maven2.asset1.extension': extension
     }
-    base_name = file_name.replace(f".{extension}", '')
-    f = rf'{version}-.+$'
-    r = re.search(f, base_name)
-    if r:
-        classifier = r.group(0).replace(f'{version}-', '')
-        info['maven2.asset1.classifier'] = classifier
+    classifier_prefix = f"{artifact_id}-{version}-"
+    if base_name.startswith(classifier_prefix):
+        info['maven2.asset1.classifier'] = base_name[len(classifier_prefix):]
     return info
 
 
@@ -348,46 +516,93 @@ def get_maven_info(repo_file):
 # https://docs.docker.com/engine/install/debian/
 
 def set_docker_image_download_path(root_dir='/var/lib/jenkins/nexus3/data/docker-images'):
+    if root_dir in docker_root_dirs_checked:
+        return
+    docker_root_dirs_checked.add(root_dir)
     docker_info = subprocess.run(['docker', 'info', '--format', 'json'], capture_output=True)
-    docker_info_o = docker_info.stdout.decode()
-    docker_info_json = json.loads(docker_info_o)
+    docker_info_json = json_loads(docker_info.stdout)
     docker_root_dir = docker_info_json['DockerRootDir']
-    print(f"Current DockerRootDir : {docker_root_dir}")
-    if docker_root_dir != root_dir:
-        log_print(f"Setting DockerRootDir to {root_dir}")
-        subprocess.run(['systemctl', 'stop', 'docker'])
-        open('/etc/docker/daemon.json', 'w').write(f'{"data-root": "{root_dir}"}')
-        subprocess.run(['systemctl', 'start', 'docker'])
+    logger.info("Current DockerRootDir : %s", docker_root_dir)
+    if docker_root_dir == root_dir:
+        return
+    logger.info("Setting DockerRootDir to %s", root_dir)
+    daemon_config = {}
+    if os.path.exists(docker_daemon_config):
+        with open(docker_daemon_config, 'rb') as f:
+            try:
+                daemon_config = json_loads(f.read() or b'{}')
+            except ValueError as e:
+                logger.warning("Ignoring invalid %s : %s", docker_daemon_config, e)
+    daemon_config['data-root'] = root_dir
+    flush_log()
+    subprocess.run(['systemctl', 'stop', 'docker'])
+    with open(docker_daemon_config, 'w') as f:
+        json.dump(daemon_config, f, indent=2)
+    subprocess.run(['systemctl', 'start', 'docker'])
+
+
+def get_local_docker_images():
+    """Return all local docker images keyed by '<repository>:<tag>', listed once until invalidated."""
+    global local_docker_images
+    if local_docker_images is None:
+        local_docker_images = {}
+        containers_json = subprocess.run(['docker', 'images', '--format', 'json'], capture_output=True)
+        for container in containers_json.stdout.splitlines():
+            container_o = json_loads(container)
+            local_docker_images[f"{container_o['Repository']}:{container_o['Tag']}"] = container_o
+    return local_docker_images
 
 
 def list_local_docker_images(filter=None):
     containers = {}
-    containers_json = subprocess.run(['docker', 'images', '--format', 'json'], capture_output=True)
-    for container in containers_json.stdout.decode().splitlines():
-        container_o = json.loads(container)
-        if filter is None or re.search(rf"{filter}", container_o['Repository']):
-            containers[f"{container_o['Repository']}:{container_o['Tag']}"] = container_o
+    if filter is not None:
+        filter = re.compile(filter)
+    for name, container_o in get_local_docker_images().items():
+        if filter is None or filter.search(container_o['Repository']):
+            containers[name] = container_o
     return containers
 
 
 def docker_login(server, username, password):
+    flush_log()
     subprocess.run(['docker', 'login', server, '-u', username, '-p', password])
 
 
+def docker_pull(image_url, progress):
+    logger.info("docker pull %s - %s", image_url, progress)
+    flush_log()
+    subprocess.run(['docker', 'pull', image_url])
+
+
 def download_repo_assets_docker(server, repo):
+    global local_docker_images
     set_docker_image_download_path()
     components = get_repo_components(repo, 'source', 0)
     source_count = len(components)
     count = 0
+    pulls = []
     for _, component in components.items():
         count += 1
         image_url = f"{server}/{component['name']}:{component['version']}"
-        log_print(f"docker pull {image_url} - {count}/{source_count}")
-        subprocess.run(['docker', 'pull', image_url])
-    log_print(f"asset_count:{count}")
+        pulls.append((image_url, f"{count}/{source_count}"))
+    run_in_pool(docker_pull, pulls)
+    local_docker_images = None
+    logger.info("asset_count:%s", count)
     return count
 
 
+def docker_push(image, progress):
+    logger.info("docker push %s - %s", image, progress)
+    flush_log()
+    subprocess.run(['docker', 'push', image])
+
+
+def docker_tag(image, target, progress):
+    logger.info("docker tag %s %s - %s", image, target, progress)
+    flush_log()
+    subprocess.run(['docker', 'tag', image, target])
+
+
 def upload_components_docker(repo, destination):
     set_docker_image_download_path()
     if not destination.endswith('/'):
@@ -396,11 +611,12 @@ def upload_components_docker(repo, destination):
     images = list_local_docker_images(rf'^{destination}',)
     source_count = len(images)
     image_count = 0
+    pushes = []
     for image, _ in images.items():
         image_count += 1
         if image.startswith(destination):
-            log_print(f"docker push {image} - {image_count}/{source_count}")
-            subprocess.run(['docker', 'push', image])
+            pushes.append((image, f"{image_count}/{source_count}"))
+    run_in_pool(docker_push, pushes)
 
 
 def tag_docker_images(source, destination):
@@ -412,16 +628,20 @@ def tag_docker_images(source, destination):
     images = list_local_docker_images()
     source_count = len(images)
     image_count = 0
+    tags = []
     for image, _ in images.items():
         image_count += 1
         image_path = image.replace(source, '')
-        # log_print(f"Tagging Docker images from {image} to {destination}{image_path}")
+        # logger.info("Tagging Docker images from %s to %s%s", image, destination, image_path)
         if image.startswith(source):
             if f"{destination}{image_path}" not in images:
-                log_print(f"docker tag {image} {destination}{image_path} - {image_count}/{source_count}")
-                subprocess.run(['docker', 'tag', image, f"{destination}{image_path}"])
+                tags.append((image, f"{destination}{image_path}", f"{image_count}/{source_count}"))
             else:
-                log_print(f"Skipping docker tag {image} {destination}{image_path} as it already exists. - {image_count}/{source_count}")
+                logger.info("Skipping docker tag %s %s%s as it already exists. - %s/%s", image, destination, image_path, image_count, source_count)
+    run_in_pool(docker_tag, tags)
+    for image, target, _ in tags:
+        repository, _, tag = target.rpartition(':')
+        local_docker_images[target] = {**images[image], 'Repository': repository, 'Tag': tag}
 
 # Cleanup ALL Docker images
 # docker rmi -f $(docker images -aq)
@@ -477,8 +697,27 @@ if __name__ == "__main__":
     parser.add_argument("--download-assets", help="Repo to download from.")
     parser.add_argument("--upload-type", help="Repo type to upload.")
     parser.add_argument("--upload-components", help="Repo to upload components to.")
+    parser.add_argument(
+        "--http-cache",
+        help="""
+            Cache source API listings for this many seconds in .nexus_cache.sqlite (requires requests-cache).
+            Can also be set as http_cache in the action file.
+        """,
+        type=int, default=None
+    )
+    parser.add_argument(
+        "--workers",
+        help=f"Number of parallel downloads / uploads / docker pulls. Default = {max_workers}",
+        type=int, default=max_workers
+    )
 
     args = parser.parse_args()
+    setup_logging()
+
+    set_max_workers(args.workers)
+
+    if args.http_cache is not None:
+        http_cache_expire = args.http_cache
 
     if args.source_server:
         set_nexus_source_server(server=args.source_server)
@@ -494,7 +733,7 @@ if __name__ == "__main__":
             print('Enter Source Nexus Password:')
             source_password = getpass.getpass()
         except Exception as e:
-            log_print('ERROR getting source password')
+            logger.error('ERROR getting source password')
             raise SystemExit(e)
     elif args.source_password:
         source_password = args.source_password
@@ -504,10 +743,10 @@ if __name__ == "__main__":
 
     if args.destination_password == 'ask':
         try:
-            log_print('Enter destination Nexus Password:')
+            print('Enter destination Nexus Password:')
             destination_password = getpass.getpass()
         except Exception as e:
-            log_print('ERROR getting destination password')
+            logger.error('ERROR getting destination password')
             raise SystemExit(e)
     elif args.destination_password:
         destination_password = args.destination_password
@@ -517,19 +756,20 @@ if __name__ == "__main__":
         if not local_path.endswith('/'):
             local_path = f"{local_path}/"
 
-    log_print(f"Local path : {local_path}")
-    log_print(f"Source Server : {source_server}")
+    logger.info("Local path : %s", local_path)
+    logger.info("Workers : %s", max_workers)
+    logger.info("Source Server : %s", source_server)
     if source_password is not None:
-        log_print(f"\tUsing Source Username : {source_user}, and provided password")
-    log_print(f"Destination Server : {destination_server}")
+        logger.info("\tUsing Source Username : %s, and provided password", source_user)
+    logger.info("Destination Server : %s", destination_server)
     if destination_password is not None:
-        log_print(f"\tUsing Destination Username : {destination_user}, and provided password")
+        logger.info("\tUsing Destination Username : %s, and provided password", destination_user)
 
     # Read from action file
     if args.file:
         file = args.file
         if not os.path.isfile(file):
-            log_print(f"File '{file}' does not exist.")
+            logger.error("File '%s' does not exist.", file)
             raise SystemExit(f"File '{file}' does not exist.")
         with open(file, 'r') as f:
             config_file = yaml.safe_load(f)
@@ -553,25 +793,29 @@ if __name__ == "__main__":
                 destination_password = config['destination_password']
             if 'local_path' in config:
                 local_path = config['local_path']
+            if 'workers' in config:
+                set_max_workers(config['workers'])
+            if 'http_cache' in config:
+                http_cache_expire = config['http_cache']
             if 'docker_source_server' in config:
                 docker_source_server = config['docker_source_server']
             if 'docker_destination_server' in config:
                 docker_destination_server = config['docker_destination_server']
         for action in config_file['actions']:
             if 'active' in action and not action['active']:
-                log_print("Action is not active: ❌❌")
+                logger.info("Action is not active: ❌❌")
                 for key, value in action.items():
-                    print(f"\t{key} : {value}")
+                    logger.info("\t%s : %s", key, value)
             else:
-                log_print("Action: ✅✅")
+                logger.info("Action: ✅✅")
                 action_type = action['type']
                 act = action.get('action', default_action)
                 path = action.get('path', f'data/{action["repo"]}')
                 for key, value in action.items():
-                    print(f"\t{key} : {value}")
-                print("\t----------------------")
-                print(f"\taction : {act}")
-                print(f"\tpath : {path}")
+                    logger.info("\t%s : %s", key, value)
+                logger.info("\t----------------------")
+                logger.info("\taction : %s", act)
+                logger.info("\tpath : %s", path)
                 if act == 'list_assets':
                     list_repo_assets(action['repo'])
                 if act == 'list_components':
@@ -606,25 +850,25 @@ if __name__ == "__main__":
                         upload_components(action['repo'], action_type, path)
 
                 # if 'cleanup' in config and config['cleanup']:
-                #     log_print("\tCleaning up...")
+                #     logger.info("\tCleaning up...")
                 #     if act in ['download_assets', 'both']:
-                #         log_print(f"\tCleaning up {path}")
+                #         logger.info("\tCleaning up %s", path)
                 #         subprocess.run(['rm', '-rf', path])
-                #     log_print("\tCleaning up done...")
+                #     logger.info("\tCleaning up done...")
 
     if args.list_assets:
-        log_print(f"Listing Assets for repo : {args.list_assets}")
+        logger.info("Listing Assets for repo : %s", args.list_assets)
         list_repo_assets(args.list_assets)
 
     if args.list_components:
-        log_print(f"Listing Components for repo : {args.list_components}")
+        logger.info("Listing Components for repo : %s", args.list_components)
         list_repo_components(args.list_components)
 
     if args.download_assets:
-        log_print(f"Downloading Assets from repo : {args.download_assets}")
+        logger.info("Downloading Assets from repo : %s", args.download_assets)
         download_repo_assets(args.download_assets, local_path)
 
     if args.upload_components and args.upload_type:
         r_type = args.upload_type
-        log_print(f"Uploading {args.upload_type} Components to repo : {args.upload_components} with filter : {filter}")
+        logger.info("Uploading %s Components to repo : %s with filter : %s", args.upload_type, args.upload_components, filter)
         upload_components(args.upload_components, args.upload_type, local_path)